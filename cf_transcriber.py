@@ -9,6 +9,34 @@ from typing import Optional, List
 from pathlib import Path
 from dotenv import load_dotenv
 
+CF_API_URL = "https://api.cloudflare.com"
+# Seconds an idle pooled connection is kept open, so the warm-up connection survives until the first voice note
+KEEPALIVE_SECONDS = 300.0
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use so connections are reused."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(keepalive_timeout=KEEPALIVE_SECONDS))
+    return _session
+
+async def warm_up_cf() -> None:
+    """Open a connection to the Cloudflare API ahead of the first transcription."""
+    try:
+        async with get_session().head(CF_API_URL) as response:
+            await response.release()
+    except Exception as e:
+        print(f"Cloudflare warm-up failed: {e}")
+
+async def close_cf() -> None:
+    """Close the shared session and its pooled connections."""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
 class CloudflareAITranscriber:
     def __init__(self, account_id: str, api_token: str, model: Optional[str] = None, language: Optional[str] = "en"):
         """Initialize the transcriber with Cloudflare credentials."""
@@ -57,18 +85,17 @@ class CloudflareAITranscriber:
                 "audio": audio_data
             }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Transcription failed: {error_text}")
-                
-                result = await response.json()
-                return result
+        async with get_session().post(
+            self.base_url,
+            headers=self.headers,
+            json=payload
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"Transcription failed: {error_text}")
+
+            result = await response.json()
+            return result
 
 class AudioProcessor:
     def __init__(self, transcriber: CloudflareAITranscriber, language: Optional[str] = None):
@@ -122,7 +149,13 @@ def main():
     parser.add_argument('--model', type=str, help='Model to use for transcription', default=None)
     args = parser.parse_args()
     
-    asyncio.run(cf_transcribe(args.audio_path, args.model))
+    asyncio.run(_run_cli(args.audio_path, args.model))
+
+async def _run_cli(audio_path: str, model: Optional[str]):
+    try:
+        await cf_transcribe(audio_path, model)
+    finally:
+        await close_cf()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
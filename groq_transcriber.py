@@ -1,7 +1,8 @@
 import os
 import aiofiles
-from groq import AsyncGroq
-from typing import Optional
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from typing import Optional, Tuple, Union
 from dotenv import load_dotenv
 import logging
 
@@ -11,7 +12,7 @@ os.makedirs(log_dir, exist_ok=True)
 
 debug_logger = logging.getLogger(__name__)
 debug_logger.setLevel(logging.DEBUG)
-debug_handler = logging.FileHandler(os.path.join(log_dir, 'debug_groq_transcriber.log'))
+debug_handler = logging.FileHandler(os.path.join(log_dir, 'debug_groq_transcriber.log'), mode='w')
 debug_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
 debug_handler.setFormatter(debug_formatter)
 debug_logger.addHandler(debug_handler)
@@ -20,13 +21,50 @@ debug_logger.addHandler(debug_handler)
 load_dotenv()
 api_key = os.getenv("GROQ_API_KEY", "API key not set")
 
+# Seconds an idle pooled connection is kept open, so the warm-up connection survives until the first voice note
+KEEPALIVE_SECONDS = 300.0
+
+_client: Optional[AsyncGroq] = None
+
+def get_client() -> AsyncGroq:
+    """Return the shared AsyncGroq client, creating it on first use so its connection pool is reused."""
+    global _client
+    if _client is None:
+        debug_logger.debug("Initializing AsyncGroq client.")
+        _client = AsyncGroq(
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(keepalive_expiry=KEEPALIVE_SECONDS))
+        )
+        debug_logger.debug("AsyncGroq client initialized successfully.")
+    return _client
+
+async def warm_up_groq() -> None:
+    """
+    Create the shared client and open a connection to the Groq API ahead of the first transcription.
+
+    Failures are logged and ignored; the first transcription will then connect as usual.
+    """
+    try:
+        await get_client().models.list()
+        debug_logger.debug("Groq connection warmed up.")
+    except Exception as e:
+        debug_logger.warning(f"Groq warm-up failed: {e}")
+
+async def close_groq() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
 async def transcribe_audio_groq(
     audio_path: str,
     model: Optional[str] = "whisper-large-v3",
     prompt: Optional[str] = None,
     language: Optional[str] = None,
-    temperature: float = 0.0
-) -> str:
+    temperature: float = 0.0,
+    return_language: bool = False
+) -> Union[str, Tuple[str, Optional[str]]]:
     """
     Asynchronously transcribe an audio file using Groq's API.
 
@@ -36,9 +74,10 @@ async def transcribe_audio_groq(
         prompt (str, optional): Context or spelling guidance for transcription. Defaults to None.
         language (str, optional): Language code (e.g., "pt" for Portuguese). Defaults to None (auto-detect).
         temperature (float, optional): Sampling temperature for transcription. Defaults to 0.0.
+        return_language (bool, optional): Request a verbose response and also return the detected language. Defaults to False.
 
     Returns:
-        str: The transcribed text
+        str: The transcribed text, or a (text, detected language) tuple if return_language is set
 
     Raises:
         FileNotFoundError: If the audio file doesn't exist
@@ -53,10 +92,7 @@ async def transcribe_audio_groq(
         raise FileNotFoundError(error_message)
 
     try:
-        # Initialize async Groq client
-        debug_logger.debug("Initializing AsyncGroq client.")
-        client = AsyncGroq(api_key=api_key)
-        debug_logger.debug("AsyncGroq client initialized successfully.")
+        client = get_client()
 
         # Open and read the audio file in binary mode asynchronously
         debug_logger.debug(f"Opening audio file: {audio_path} for reading.")
@@ -92,12 +128,17 @@ async def transcribe_audio_groq(
             file=(audio_path, audio_data),
             model=model,
             prompt=prompt,
-            response_format='json',
+            response_format='verbose_json' if return_language else 'json',
             language=language,
             temperature=temperature
         )
         debug_logger.debug("Transcription request completed successfully.")
 
+        if return_language:
+            detected_language = getattr(response, "language", None)
+            debug_logger.debug(f"Detected language: {detected_language}")
+            return response.text, detected_language
+
         return response.text # Return transcribed text
 
     except FileNotFoundError as fnf_error:
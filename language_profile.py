@@ -0,0 +1,185 @@
+import json
+import os
+import logging
+from typing import Dict, Optional, Tuple
+
+debug_logger = logging.getLogger(__name__)
+
+LANGUAGE_PROFILES_FILE = "language_profiles.json"
+
+# Languages Whisper can detect, by code; verbose responses report the detected language by name
+WHISPER_LANGUAGES = {
+    "en": "english", "zh": "chinese", "de": "german", "es": "spanish", "ru": "russian",
+    "ko": "korean", "fr": "french", "ja": "japanese", "pt": "portuguese", "tr": "turkish",
+    "pl": "polish", "ca": "catalan", "nl": "dutch", "ar": "arabic", "sv": "swedish",
+    "it": "italian", "id": "indonesian", "hi": "hindi", "fi": "finnish", "vi": "vietnamese",
+    "he": "hebrew", "uk": "ukrainian", "el": "greek", "ms": "malay", "cs": "czech",
+    "ro": "romanian", "da": "danish", "hu": "hungarian", "ta": "tamil", "no": "norwegian",
+    "th": "thai", "ur": "urdu", "hr": "croatian", "bg": "bulgarian", "lt": "lithuanian",
+    "la": "latin", "mi": "maori", "ml": "malayalam", "cy": "welsh", "sk": "slovak",
+    "te": "telugu", "fa": "persian", "lv": "latvian", "bn": "bengali", "sr": "serbian",
+    "az": "azerbaijani", "sl": "slovenian", "kn": "kannada", "et": "estonian", "mk": "macedonian",
+    "br": "breton", "eu": "basque", "is": "icelandic", "hy": "armenian", "ne": "nepali",
+    "mn": "mongolian", "bs": "bosnian", "kk": "kazakh", "sq": "albanian", "sw": "swahili",
+    "gl": "galician", "mr": "marathi", "pa": "punjabi", "si": "sinhala", "km": "khmer",
+    "sn": "shona", "yo": "yoruba", "so": "somali", "af": "afrikaans", "oc": "occitan",
+    "ka": "georgian", "be": "belarusian", "tg": "tajik", "sd": "sindhi", "gu": "gujarati",
+    "am": "amharic", "yi": "yiddish", "lo": "lao", "uz": "uzbek", "fo": "faroese",
+    "ht": "haitian creole", "ps": "pashto", "tk": "turkmen", "nn": "nynorsk", "mt": "maltese",
+    "sa": "sanskrit", "lb": "luxembourgish", "my": "myanmar", "bo": "tibetan", "tl": "tagalog",
+    "mg": "malagasy", "as": "assamese", "tt": "tatar", "haw": "hawaiian", "ln": "lingala",
+    "ha": "hausa", "ba": "bashkir", "jw": "javanese", "su": "sundanese", "yue": "cantonese",
+}
+
+LANGUAGE_NAMES = {name: code for code, name in WHISPER_LANGUAGES.items()}
+LANGUAGE_NAMES.update({
+    "burmese": "my", "valencian": "ca", "flemish": "nl", "haitian": "ht", "letzeburgesch": "lb",
+    "pushto": "ps", "panjabi": "pa", "moldavian": "ro", "moldovan": "ro", "sinhalese": "si",
+    "castilian": "es", "mandarin": "zh",
+})
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """
+    Convert a detected language (name or code) into a Whisper language code.
+
+    Args:
+        language (str, optional): Language as reported by the provider, e.g. "english" or "en-US".
+
+    Returns:
+        str: Lowercase Whisper language code, or None if the language is unknown.
+    """
+    if not language:
+        return None
+    language = language.strip().lower()
+    if language in LANGUAGE_NAMES:
+        return LANGUAGE_NAMES[language]
+    code = language.replace("_", "-").split("-")[0]
+    if code in WHISPER_LANGUAGES:
+        return code
+    return None
+
+
+class LanguageProfileStore:
+    """Per-chat language profiles learned from detected languages."""
+
+    def __init__(
+        self,
+        filepath: str = LANGUAGE_PROFILES_FILE,
+        decay: float = 0.8,
+        min_confidence: float = 0.7,
+        min_weight: float = 1.5,
+        probe_interval: int = 10
+    ):
+        """
+        Args:
+            filepath (str): JSON file the profiles are persisted to.
+            decay (float): Factor applied to existing scores on every new observation.
+            min_confidence (float): Share of the total score the dominant language needs.
+            min_weight (float): Total score needed before a chat is routed at all.
+            probe_interval (int): Re-detect the language every N routed messages.
+        """
+        self.filepath = filepath
+        self.decay = decay
+        self.min_confidence = min_confidence
+        self.min_weight = min_weight
+        self.probe_interval = probe_interval
+        self.profiles: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.filepath, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            debug_logger.error(f"Could not read {self.filepath}, starting with empty profiles: {e}")
+            return {}
+
+    def _save(self) -> None:
+        tmp_path = self.filepath + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.profiles, file, indent=2)
+            os.replace(tmp_path, self.filepath)
+        except OSError as e:
+            # Profiles stay in memory; failing to persist them must never cost a transcription
+            debug_logger.error(f"Could not write {self.filepath}: {e}")
+
+    def _profile(self, chat: str) -> Dict:
+        return self.profiles.setdefault(chat, {"scores": {}, "override": None, "since_probe": 0})
+
+    def observe(self, chat: str, language: Optional[str]) -> None:
+        """Record a detected language for a chat, decaying older observations."""
+        language = normalize_language(language)
+        if language is None:
+            return
+        profile = self._profile(chat)
+        scores = {
+            lang: score * self.decay
+            for lang, score in profile["scores"].items()
+            if score * self.decay >= 0.01
+        }
+        scores[language] = scores.get(language, 0.0) + 1.0
+        profile["scores"] = scores
+        profile["since_probe"] = 0
+        debug_logger.debug(f"Language profile for {chat}: {scores}")
+        self._save()
+
+    def dominant_language(self, chat: str) -> Tuple[Optional[str], float]:
+        """Return the chat's dominant language and its confidence (0 to 1)."""
+        profile = self.profiles.get(chat)
+        if not profile or not profile["scores"]:
+            return None, 0.0
+        total = sum(profile["scores"].values())
+        language, score = max(profile["scores"].items(), key=lambda item: item[1])
+        if total < self.min_weight:
+            return None, score / total
+        return language, score / total
+
+    def set_override(self, chat: str, language: Optional[str]) -> Optional[str]:
+        """
+        Force a chat to a language; None (or "auto") returns it to learned routing.
+
+        Returns:
+            str: The normalized language code, or None when the override was cleared.
+
+        Raises:
+            ValueError: If the language is not one Whisper supports
+        """
+        override = None
+        if language is not None and language.strip().lower() != "auto":
+            override = normalize_language(language)
+            if override is None:
+                raise ValueError(f"Unsupported language: {language}")
+        self._profile(chat)["override"] = override
+        self._save()
+        return override
+
+    def resolve(self, chat: str) -> Tuple[Optional[str], bool]:
+        """
+        Decide which language a chat's next message should be transcribed in.
+
+        Args:
+            chat (str): Chat identifier (phone number).
+
+        Returns:
+            tuple: (language, detect). language is None when it should be auto-detected;
+            detect is True when the provider's detected language should be fed back via observe().
+        """
+        profile = self.profiles.get(chat)
+        if profile and profile["override"]:
+            return profile["override"], False
+
+        language, confidence = self.dominant_language(chat)
+        if language is None or confidence < self.min_confidence:
+            return None, True
+
+        profile["since_probe"] = profile.get("since_probe", 0) + 1
+        if profile["since_probe"] >= self.probe_interval:
+            # Occasionally auto-detect so the profile can follow a chat that changes language;
+            # the counter restarts here so a failed or unrecognised probe does not repeat forever
+            profile["since_probe"] = 0
+            self._save()
+            return None, True
+        return language, False
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+debug_logger = logging.getLogger(__name__)
+
+MAX_REPLY_LENGTH = 4000
+
+
+def split_reply(text: str, max_length: int = MAX_REPLY_LENGTH) -> List[str]:
+    """
+    Split a reply into chunks no longer than max_length.
+
+    Prefers breaking at paragraph, line and word boundaries, in that order.
+
+    Args:
+        text (str): Reply text
+        max_length (int, optional): Maximum chunk length. Defaults to MAX_REPLY_LENGTH.
+
+    Returns:
+        list: Reply chunks, in order
+    """
+    if max_length <= 0:
+        raise ValueError(f"max_length must be positive, got {max_length}")
+    chunks = []
+    while len(text) > max_length:
+        cut = -1
+        for separator in ("\n\n", "\n", " "):
+            cut = text.rfind(separator, 0, max_length)
+            if cut > 0:
+                break
+        if cut <= 0:
+            cut = max_length
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class OutgoingReply:
+    """A reply waiting to be sent."""
+
+    def __init__(self, to, quoted, body: str, header: str = "", italic: bool = False, mergeable: bool = False):
+        self.to = to
+        self.quoted = quoted
+        self.bodies = [body]
+        self.header = header
+        self.italic = italic
+        self.mergeable = mergeable
+
+    def chunks(self, max_length: int = MAX_REPLY_LENGTH) -> List[str]:
+        """
+        Split the body into messages of at most max_length characters, formatted for sending.
+
+        Every message carries the header, numbered when the body is split. With italic set,
+        each line is wrapped in its own markers, since WhatsApp italics do not span lines.
+
+        Raises:
+            ValueError: If max_length leaves no room for the body after the header and markers
+        """
+        body = "\n\n".join(self.bodies)
+        if self.header:
+            # Reserve room for the longest possible " (n/n)" numbering and the blank line
+            digits = len(str(len(body) + 1))
+            budget = max_length - len(self.header) - (2 * digits + 4) - 2
+        else:
+            budget = max_length
+        marker = 2 if self.italic else 0
+        if budget <= marker:
+            raise ValueError(f"max_length {max_length} is too small for the header and formatting")
+
+        # Format line by line, cutting lines that are too long on their own
+        lines: List[str] = []
+        for line in body.split("\n"):
+            line = line.strip()
+            if not line:
+                lines.append("")
+                continue
+            for piece in split_reply(line, budget - marker):
+                lines.append(f"_{piece}_" if self.italic else piece)
+
+        # Pack whole formatted lines into messages
+        parts: List[List[str]] = []
+        current: List[str] = []
+        length = 0
+        for line in lines:
+            added = len(line) + (1 if current else 0)
+            if current and length + added > budget:
+                parts.append(current)
+                current, length = [], 0
+                added = len(line)
+            if not current and not line:
+                continue
+            current.append(line)
+            length += added
+        if current:
+            parts.append(current)
+
+        messages = ["\n".join(part).strip("\n") for part in parts]
+        messages = [message for message in messages if message]
+        if not self.header:
+            return messages
+        return [
+            f"{self.header} ({i}/{len(messages)})\n\n{message}" if len(messages) > 1 else f"{self.header}\n\n{message}"
+            for i, message in enumerate(messages, 1)
+        ]
+
+
+class ReplySender:
+    """Outbound stage that sends replies independently of download and transcription."""
+
+    def __init__(
+        self,
+        client,
+        global_interval: float = 0.5,
+        chat_interval: float = 2.0,
+        merge_window: float = 0.0,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+        send_timeout: float = 20.0,
+        drain_timeout: float = 10.0
+    ):
+        """
+        Args:
+            client: neonize client used to send replies.
+            global_interval (float): Minimum seconds between any two sends.
+            chat_interval (float): Minimum seconds between two sends to the same chat.
+            merge_window (float): Seconds to wait for more transcripts for the same chat
+                before sending them as one message. 0 disables merging.
+            max_attempts (int): Send attempts per chunk before giving up.
+            backoff (float): Delay before the first retry, doubled on every retry.
+            send_timeout (float): Seconds a single send attempt may take.
+            drain_timeout (float): Seconds stop() waits for queued replies before dropping them.
+        """
+        self.client = client
+        self.global_interval = global_interval
+        self.chat_interval = chat_interval
+        self.merge_window = merge_window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.send_timeout = send_timeout
+        self.drain_timeout = drain_timeout
+        self.pending: Dict[str, OutgoingReply] = {}
+        # One queue and worker per chat, so a slow chat never holds up the others
+        self.chat_queues: Dict[str, asyncio.Queue] = {}
+        self.chat_workers: Dict[str, asyncio.Task] = {}
+        self.global_lock = asyncio.Lock()
+        self.last_send = 0.0
+        self.last_chat_send: Dict[str, float] = {}
+
+    async def stop(self) -> None:
+        """Send whatever is still pending, waiting at most drain_timeout, then stop all workers."""
+        for chat in list(self.pending):
+            self._flush(chat)
+        workers = list(self.chat_workers.values())
+        if workers:
+            _, unfinished = await asyncio.wait(workers, timeout=self.drain_timeout)
+            for worker in unfinished:
+                worker.cancel()
+            if unfinished:
+                debug_logger.warning(f"Dropped replies for {len(unfinished)} chat(s) on shutdown")
+
+    def submit(self, to, quoted, body: str, header: str = "", italic: bool = False, mergeable: bool = False) -> None:
+        """
+        Queue a reply for sending.
+
+        Args:
+            to: Chat JID to reply to
+            quoted: Message event being replied to
+            body (str): Reply text, without header or formatting
+            header (str, optional): Title sent at the top of every message, numbered when the body is split. Defaults to "".
+            italic (bool, optional): Send the body in italics. Defaults to False.
+            mergeable (bool, optional): Allow merging with other mergeable replies to the same chat. Defaults to False.
+        """
+        reply = OutgoingReply(to, quoted, body, header, italic, mergeable)
+        chat = str(to.User)
+        if not mergeable or self.merge_window <= 0:
+            # Transcripts still waiting to be merged completed first, so they go out first
+            self._flush(chat)
+            self._enqueue(reply)
+            return
+
+        pending = self.pending.get(chat)
+        if pending is not None and pending.header == header and pending.italic == italic:
+            pending.bodies.append(body)
+            debug_logger.debug(f"Merged reply for chat {chat} ({len(pending.bodies)} transcripts)")
+            return
+        if pending is not None:
+            self._flush(chat)
+        self.pending[chat] = reply
+        asyncio.get_running_loop().call_later(self.merge_window, self._flush, chat)
+
+    def _flush(self, chat: str) -> None:
+        reply = self.pending.pop(chat, None)
+        if reply is not None:
+            self._enqueue(reply)
+
+    def _enqueue(self, reply: OutgoingReply) -> None:
+        chat = str(reply.to.User)
+        queue = self.chat_queues.get(chat)
+        if queue is None:
+            queue = self.chat_queues[chat] = asyncio.Queue()
+        queue.put_nowait(reply)
+        if chat not in self.chat_workers:
+            self.chat_workers[chat] = asyncio.create_task(self._run_chat(chat, queue))
+
+    async def _run_chat(self, chat: str, queue: asyncio.Queue) -> None:
+        try:
+            while not queue.empty():
+                reply = queue.get_nowait()
+                try:
+                    chunks = reply.chunks()
+                    if not chunks:
+                        debug_logger.warning(f"Reply to {chat} has no text, nothing sent")
+                    for chunk in chunks:
+                        await self._send(chat, reply, chunk)
+                except Exception as e:
+                    debug_logger.error(f"Giving up on reply to {chat}: {e!r}", exc_info=True)
+        finally:
+            # Nothing can be queued between the empty check and here, so the worker exits cleanly
+            self.chat_workers.pop(chat, None)
+            self.chat_queues.pop(chat, None)
+
+    async def _throttle(self, chat: str) -> None:
+        wait = self.last_chat_send.get(chat, 0.0) + self.chat_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        async with self.global_lock:
+            wait = self.last_send + self.global_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.last_send = time.monotonic()
+        self.last_chat_send[chat] = time.monotonic()
+
+    async def _send(self, chat: str, reply: OutgoingReply, chunk: str) -> None:
+        delay = self.backoff
+        for attempt in range(1, self.max_attempts + 1):
+            await self._throttle(chat)
+            try:
+                await asyncio.wait_for(
+                    self.client.reply_message(message=chunk, quoted=reply.quoted, to=reply.to),
+                    timeout=self.send_timeout
+                )
+                debug_logger.debug(f"Reply chunk sent to chat {chat}")
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    raise
+                debug_logger.warning(f"Send to chat {chat} failed (attempt {attempt}/{self.max_attempts}): {e!r}")
+                await asyncio.sleep(delay)
+                delay *= 2
@@ -0,0 +1,37 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class StartupTimer:
+    """Records how long each startup phase takes, measured from process start."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.started: Dict[str, float] = {}
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_at: Optional[float] = None
+
+    def start(self, phase: str) -> None:
+        """Mark the beginning of a phase."""
+        self.started[phase] = time.perf_counter()
+
+    def stop(self, phase: str) -> None:
+        """Mark the end of a phase started with start(); phases without a start are timed from process start."""
+        begin = self.started.pop(phase, self.t0)
+        self.phases.append((phase, time.perf_counter() - begin))
+
+    def ready(self) -> bool:
+        """Mark the bot as ready to transcribe. Returns False if it was already marked."""
+        if self.ready_at is not None:
+            return False
+        self.ready_at = time.perf_counter() - self.t0
+        return True
+
+    def report(self) -> str:
+        """Format the recorded phases as a one-line-per-phase report."""
+        lines = ["Startup timing:"]
+        for phase, duration in self.phases:
+            lines.append(f"  {phase:<18} {duration * 1000:8.1f} ms")
+        if self.ready_at is not None:
+            lines.append(f"  {'first-ready':<18} {self.ready_at * 1000:8.1f} ms")
+        return "\n".join(lines)
@@ -1,23 +1,33 @@
+from startup_timer import StartupTimer
+startup_timer = StartupTimer()
+
 import asyncio
 import logging
 import os
 import sys
 import signal
-import shutil
 from pathlib import Path
+from types import ModuleType
 from typing import Dict, Optional, Tuple
-from groq_transcriber import transcribe_audio_groq
-from cf_transcriber import cf_transcribe
+from dotenv import load_dotenv
+from language_profile import LanguageProfileStore
+from reply_sender import ReplySender
 from neonize.aioze.client import NewAClient
 from neonize.events import ConnectedEv, MessageEv, PairStatusEv, event
 from neonize.types import MessageServerID
 from neonize.utils import log as neonize_log, get_message_type
 from neonize.utils.enum import ReceiptType, MediaType
 
+startup_timer.stop("imports")
+
 sys.path.insert(0, os.getcwd())
+load_dotenv()
 
 # Constants
 
+# Transcription backend, imported on first use: "groq" or "cloudflare"
+TRANSCRIBER_BACKEND = os.getenv("TRANSCRIBER_BACKEND", "groq").lower()
+
 # Define the path to your exclusion list file
 EXCLUDED_NUMBERS_FILE = "exclude.txt"
 
@@ -33,20 +43,25 @@ def load_excluded_numbers(filepath: str) -> set:
         print(f"Warning: {filepath} not found. Using default exclusions.")
         return set()
 
-# Load excluded numbers
-EXCLUDED_NUMBERS = load_excluded_numbers(EXCLUDED_NUMBERS_FILE)
-
-print(EXCLUDED_NUMBERS)  # Debug: Print loaded numbers
-
 WHISPER_PROMPT = """Transcreva com precisão, preservando enunciados conforme falados. Corrija erros ortográficos comuns sem alterar a intenção original. Use pontuação e capitalização de forma natural para facilitar a leitura. Foda-se. Amorzinho."""
+WHISPER_PROMPT_EN = """Transcribe accurately, preserving utterances as spoken. Fix common spelling mistakes without changing the original intent. Use natural punctuation and capitalization for readability."""
+
+# Fastest model and prompt for each chat's dominant language; others use whisper-large-v3 without a prompt
+LANGUAGE_ROUTES = {
+    "en": {"model": "distil-whisper-large-v3-en", "prompt": WHISPER_PROMPT_EN},
+    "pt": {"model": "whisper-large-v3", "prompt": WHISPER_PROMPT},
+}
+DEFAULT_ROUTE = {"model": "whisper-large-v3", "prompt": None}
+# Chats without a confident profile are auto-detected on whisper-large-v3 with the prompt of the
+# default language, which keeps Portuguese (the usual workload) accurate while the profile is learned
+DEFAULT_LANGUAGE = "pt"
+DETECT_ROUTE = {"model": "whisper-large-v3", "prompt": WHISPER_PROMPT}
 LOG_DIR = "logs"
 MESSAGES_DIR = "./messages"
 
-# Setup logging
+# Setup logging; log files are truncated on every start
 os.makedirs(LOG_DIR, exist_ok=True)
 os.makedirs(MESSAGES_DIR, exist_ok=True)
-shutil.rmtree(LOG_DIR, ignore_errors=True)
-os.makedirs(LOG_DIR, exist_ok=True)
 
 def interrupted(*_):
     """Signal handler for interrupting the application."""
@@ -59,20 +74,20 @@ logging.basicConfig(
     level=logging.DEBUG,
     format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
     handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, 'debug.log')),
+        logging.FileHandler(os.path.join(LOG_DIR, 'debug.log'), mode='w'),
         logging.StreamHandler()
     ]
 )
 
 info_logger = logging.getLogger("info_logger")
 info_logger.setLevel(logging.INFO)
-info_handler = logging.FileHandler(os.path.join(LOG_DIR, 'info.log'))
+info_handler = logging.FileHandler(os.path.join(LOG_DIR, 'info.log'), mode='w')
 info_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 info_logger.addHandler(info_handler)
 
 error_logger = logging.getLogger("error_logger")
 error_logger.setLevel(logging.ERROR)
-error_handler = logging.FileHandler(os.path.join(LOG_DIR, 'error.log'))
+error_handler = logging.FileHandler(os.path.join(LOG_DIR, 'error.log'), mode='w')
 error_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'))
 error_logger.addHandler(error_handler)
 
@@ -80,7 +95,43 @@ debug_logger = logging.getLogger(__name__)
 neonize_log.setLevel(logging.WARNING)
 
 event = asyncio.Event()
+startup_timer.start("client init")
 client = NewAClient("db.sqlite3")
+startup_timer.stop("client init")
+language_profiles = LanguageProfileStore()
+# Seconds to wait for more transcripts from the same chat before replying once (0 disables merging)
+reply_sender = ReplySender(client, merge_window=float(os.getenv("REPLY_MERGE_WINDOW", "0")))
+
+_backend: Optional[ModuleType] = None
+
+def load_backend() -> ModuleType:
+    """Import the configured transcription backend on first use."""
+    global _backend
+    if _backend is None:
+        if TRANSCRIBER_BACKEND == "cloudflare":
+            import cf_transcriber
+            _backend = cf_transcriber
+        else:
+            import groq_transcriber
+            _backend = groq_transcriber
+    return _backend
+
+async def warm_up_backend() -> None:
+    """Import the backend and open its provider connection before the first audio message arrives."""
+    backend = load_backend()
+    if TRANSCRIBER_BACKEND == "cloudflare":
+        await backend.warm_up_cf()
+    else:
+        await backend.warm_up_groq()
+
+async def close_backend() -> None:
+    """Close the backend's shared provider connection, if the backend was loaded."""
+    if _backend is None:
+        return
+    if TRANSCRIBER_BACKEND == "cloudflare":
+        await _backend.close_cf()
+    else:
+        await _backend.close_groq()
 
 class TranscriptionJob:
     """Class to handle transcription jobs for audio messages."""
@@ -107,7 +158,7 @@ class TranscriptionJob:
         return self.message, self.audio_details, self.chat_id
 
     async def handle_audio_message(self) -> None:
-        """Download, transcribe, and reply to audio messages."""
+        """Download and transcribe audio messages, queueing the reply with the reply sender."""
         if not self.audio_details or not self.chat_id:
             raise ValueError("Audio details or chat ID not set.")
 
@@ -136,39 +187,71 @@ class TranscriptionJob:
                 f.write(audio_data)
             info_logger.info(f"Audio message downloaded and saved to: {file_path}")
 
-            # Transcribe audio using Groq API
+            # Transcribe audio, routed by the chat's language profile
+            backend = load_backend()
+            chat_key = str(self.chat_id.User)
+            language, detect = language_profiles.resolve(chat_key)
             info_logger.info(f"Transcribing audio file: {file_path}")
-            transcription = await transcribe_audio_groq(audio_path=file_path, prompt=WHISPER_PROMPT, language='pt')
-            #transcription = await cf_transcribe(audio_path=file_path, model='@cf/openai/whisper-large-v3-turbo', language='pt')
+            if TRANSCRIBER_BACKEND == "cloudflare":
+                # Cloudflare does not report the detected language, so learned profiles are not updated
+                transcription = await backend.cf_transcribe(audio_path=file_path, model='@cf/openai/whisper-large-v3-turbo', language=language or DEFAULT_LANGUAGE)
+            elif detect:
+                info_logger.info(f"Auto-detecting language for chat: {chat_key}")
+                transcription, detected_language = await backend.transcribe_audio_groq(audio_path=file_path, model=DETECT_ROUTE["model"], prompt=DETECT_ROUTE["prompt"], return_language=True)
+                language_profiles.observe(chat_key, detected_language)
+            else:
+                route = LANGUAGE_ROUTES.get(language, DEFAULT_ROUTE)
+                info_logger.info(f"Chat {chat_key} routed to {route['model']} (language: {language})")
+                try:
+                    transcription = await backend.transcribe_audio_groq(audio_path=file_path, model=route["model"], prompt=route["prompt"], language=language)
+                except FileNotFoundError:
+                    raise
+                except Exception as e:
+                    if route["model"] == DEFAULT_ROUTE["model"]:
+                        raise
+                    # A retired or unavailable model must not turn into error replies for the whole chat
+                    error_logger.error(f"Routed model {route['model']} failed, falling back to {DEFAULT_ROUTE['model']}: {e}")
+                    transcription = await backend.transcribe_audio_groq(audio_path=file_path, model=DEFAULT_ROUTE["model"], prompt=DEFAULT_ROUTE["prompt"], language=language)
             info_logger.info("Audio transcription completed.")
 
             os.remove(file_path)  # Clean up audio file after transcription
             debug_logger.debug(f"Temporary audio file removed: {file_path}")
 
             # Reply with transcription
-            transcription = transcription.lstrip(' ')
-            transcription = '_' + transcription + '_'
-            reply_text = f"*Transcrição automática:*\n\n{transcription}"
-
-            info_logger.info(f"Replying with transcription to chat: {self.chat_id}")
-            await self.client.reply_message(
-                message=reply_text,
+            transcription = transcription.strip()
+            if not transcription:
+                # Silent voice notes still get a reply, as they always have
+                info_logger.info("Transcription is empty, replying with a placeholder.")
+                transcription = "(nenhuma fala detectada)"
+
+            info_logger.info(f"Queueing transcription reply to chat: {self.chat_id}")
+            reply_sender.submit(
+                to=self.chat_id,
                 quoted=self.message,
-                to=self.chat_id
+                body=transcription,
+                header="*Transcrição automática:*",
+                italic=True,
+                mergeable=True
             )
-            info_logger.info("Reply sent successfully.")
 
         except FileNotFoundError as e:
             error_logger.error(f"File not found error during audio processing: {e}", exc_info=True)
-            await self.client.reply_message(message="Erro ao processar o áudio (Arquivo não encontrado).", quoted=self.message, to=self.chat_id)
+            reply_sender.submit(to=self.chat_id, quoted=self.message, body="Erro ao processar o áudio (Arquivo não encontrado).")
         except Exception as e:
             error_logger.error(f"Error handling audio message: {e}", exc_info=True)
-            await self.client.reply_message(message="Erro ao processar o áudio. Por favor, tente novamente.", quoted=self.message, to=self.chat_id)
+            reply_sender.submit(to=self.chat_id, quoted=self.message, body="Erro ao processar o áudio. Por favor, tente novamente.")
 
 @client.event(ConnectedEv)
 async def on_connected(_: NewAClient, __: ConnectedEv) -> None:
     """Event handler for when the client connects to WhatsApp."""
     info_logger.info("⚡ Connected to WhatsApp")
+    if startup_timer.ready_at is None:
+        startup_timer.stop("DB open + connect")
+        startup_timer.start("backend warm-up")
+        await warm_up_backend()
+        startup_timer.stop("backend warm-up")
+        startup_timer.ready()
+        info_logger.info(startup_timer.report())
 
 @client.event(PairStatusEv)
 async def PairStatusMessage(_: NewAClient, message: PairStatusEv) -> None:
@@ -265,6 +348,19 @@ async def on_message(client: NewAClient, message: MessageEv) -> None:
                 pass
     else:
         exclude_txt = None
+
+    if message.Info.MessageSource.IsFromMe == True and "/lang " in str(message_type):
+        # /lang <number> <language code|auto>
+        try:
+            lang_args = str(message_type).split("/lang ")[1].split('"')[0].split()
+            lang_number = lang_args[0]
+            lang_code = lang_args[1] if len(lang_args) > 1 else "auto"
+            override = language_profiles.set_override(lang_number, lang_code)
+            print(f"Language for {lang_number} set to {override or 'auto'}")
+        except IndexError:
+            pass
+        except ValueError as e:
+            print(f"Language for {lang_number} not changed: {e}")
  
     if 'text: "Erro ao processar o áudio.' in str(message_type):
         info_logger.info("Message is a transcription error message, ignoring...")
@@ -314,6 +410,8 @@ async def start() -> None:
     """Start the WhatsApp client and event loop."""
     info_logger.info("Starting WhatsApp client...")
     try:
+        # neonize opens the sqlite session store inside connect(), so both are timed together
+        startup_timer.start("DB open + connect")
         await client.connect()
         info_logger.info("Client connected and running.")
         await event.wait()
@@ -321,6 +419,8 @@ async def start() -> None:
         error_logger.error(f"Failed to start client: {e}", exc_info=True)
     finally:
         event.set()
+        await reply_sender.stop()
+        await close_backend()
         await client.disconnect()
         info_logger.info("Client application finished.")
 